@@ -1,29 +1,34 @@
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from enum import Enum, auto
-from multiprocessing.pool import ThreadPool as Pool
-from os import getcwd, mkdir, PathLike, listdir
-from os.path import join, exists
-from random import randint
-from shutil import rmtree
+from importlib.util import find_spec
+from io import BytesIO
+from os import cpu_count, environ, getcwd, makedirs, mkdir, PathLike, remove, replace, scandir, walk
+from os.path import join, exists, dirname
+from random import uniform
 from sys import argv
-from time import sleep
-from typing import Tuple, Union, List
-from urllib.error import HTTPError
-from urllib.request import urlopen
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, Optional, Tuple, Union, List
 from warnings import warn
 import argparse
+import asyncio
+import json
 import re
+import httpx
 import img2pdf
 import ocrmypdf
+import pikepdf
 
 
 def main(arguments: list) -> None:
-    args = parse_arguments(arguments)
+    args, converters = parse_arguments(arguments)
     if args.interactive:
-        args = interactive_parsing(args)
+        args = interactive_parsing(args, converters)
     if (not args.url or not args.pages) and args.download:
         print("URL and Pages required for downloading, entering interactive parsing.")
-        args = interactive_parsing(args)
+        args = interactive_parsing(args, converters)
         if not args.url or not args.pages:
             print("Still missing URL or Pages, exiting...")
             return None
@@ -33,22 +38,27 @@ def main(arguments: list) -> None:
     pdf_name = f"{args.title} - {args.author}.pdf"  # default name
 
     if args.download:
-        if exists(img_dir):
-            rmtree(img_dir)
-        mkdir(img_dir)
+        if not exists(img_dir):
+            mkdir(img_dir)
         if "babel.hathitrust.org" in args.url:
-            download_images(
-                base_url=args.url,
-                npages=args.pages,
-                directory=img_dir,
-                site=Site.BABLE,
+            asyncio.run(
+                download_images(
+                    base_url=args.url,
+                    npages=args.pages,
+                    directory=img_dir,
+                    site=Site.BABLE,
+                    concurrency=args.concurrency,
+                )
             )
         elif "archive.org" in args.url:
-            download_images(
-                base_url=args.url,
-                npages=args.pages,
-                directory=img_dir,
-                site=Site.ARCHIVE,
+            asyncio.run(
+                download_images(
+                    base_url=args.url,
+                    npages=args.pages,
+                    directory=img_dir,
+                    site=Site.ARCHIVE,
+                    concurrency=args.concurrency,
+                )
             )
         else:
             print("Not a recognized URL, exiting...")
@@ -63,7 +73,7 @@ def main(arguments: list) -> None:
             title=args.title,
         )
     if args.ocr:
-        ocr_pdf(directory=pdf_dif, pdf_file=pdf_name)
+        ocr_pdf(directory=pdf_dif, pdf_file=pdf_name, tessdata_dir=args.tessdata_dir)
 
 
 class Site(Enum):
@@ -71,10 +81,47 @@ class Site(Enum):
     ARCHIVE = auto()
 
 
-def parse_arguments(args: list) -> argparse.Namespace:
+FILE_SIGNATURES: Tuple[Tuple[bytes, str], ...] = (
+    (b"\x47\x49\x46\x38\x37\x61", ".gif"),
+    (b"\x47\x49\x46\x38\x39\x61", ".gif"),
+    (b"\x89\x50\x4E\x47\x0D\x0A\x1A\x0A", ".png"),
+    (b"\xFF\xD8\xFF\xDB", ".jpg"),
+    (b"\xFF\xD8\xFF\xE0\x00\x10\x4A\x46\x49\x46\x00\x01", ".jpg"),
+)
+# http2 needs the optional h2 package (pip install httpx[http2]), fall back to http/1.1 without it
+HTTP2 = find_spec("h2") is not None
+WRITE_BATCH_SIZE = 512 * 1024
+SNIFF_SIZE = 16
+READ_WORKERS = 8
+READ_AHEAD = 16
+PAGES_PER_DIRECTORY = 100
+RETRY_ATTEMPTS = 10
+RETRY_BASE = 1.0
+RETRY_CAP = 30.0
+# transport failures worth retrying, anything else (bad url, unsupported protocol, ...) fails straight away
+TRANSIENT_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+LETTER = (img2pdf.in_to_pt(8.5), img2pdf.in_to_pt(11))
+LETTER_LAYOUT = img2pdf.get_layout_fun(LETTER)
+SEQ_EXPRESSION = re.compile(r"seq=\d+")
+ARCHIVE_EXPRESSION = re.compile(r"_\d+\.jp2")
+
+
+def parse_arguments(args: list) -> Tuple[argparse.Namespace, Dict[str, Callable[[str], object]]]:
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    parser.add_argument("-u", "--url", help="url", default="", type=str, dest="url")
-    parser.add_argument(
+    # converters for interactive parsing, recorded as each argument is added.  flags have no type, so parse a bool
+    converters = {}
+
+    def add_argument(*names, prompt: bool = True, **kwargs) -> None:
+        parser.add_argument(*names, **kwargs)
+        if not prompt:
+            return
+        if "type" in kwargs:
+            converters[kwargs["dest"]] = kwargs["type"]
+        elif kwargs.get("action") in ("store_true", "store_false"):
+            converters[kwargs["dest"]] = parse_bool
+
+    add_argument("-u", "--url", help="url", default="", type=str, dest="url")
+    add_argument(
         "-n",
         "--pages",
         help="number of pages",
@@ -82,7 +129,7 @@ def parse_arguments(args: list) -> argparse.Namespace:
         type=int,
         dest="pages",
     )
-    parser.add_argument(
+    add_argument(
         "-a",
         "--author",
         help="name of author",
@@ -90,7 +137,7 @@ def parse_arguments(args: list) -> argparse.Namespace:
         type=str,
         dest="author",
     )
-    parser.add_argument(
+    add_argument(
         "-t",
         "--title",
         help="title of book",
@@ -98,7 +145,7 @@ def parse_arguments(args: list) -> argparse.Namespace:
         type=str,
         dest="title",
     )
-    parser.add_argument(
+    add_argument(
         "-d",
         "--nodownload",
         help="Don't download images.  Will use existing downloaded images.",
@@ -106,7 +153,7 @@ def parse_arguments(args: list) -> argparse.Namespace:
         action="store_false",
         dest="download",
     )
-    parser.add_argument(
+    add_argument(
         "-p",
         "--pdf",
         help="Make pdf?",
@@ -114,7 +161,7 @@ def parse_arguments(args: list) -> argparse.Namespace:
         action="store_true",
         dest="pdf",
     )
-    parser.add_argument(
+    add_argument(
         "-o",
         "--ocr",
         help="OCR document?",
@@ -122,115 +169,330 @@ def parse_arguments(args: list) -> argparse.Namespace:
         action="store_true",
         dest="ocr",
     )
-    parser.add_argument(
+    add_argument(
+        "--tessdata-dir",
+        help="Directory of tesseract models to OCR with instead of the installed ones, e.g. tessdata_fast.",
+        default="",
+        type=str,
+        dest="tessdata_dir",
+    )
+    add_argument(
+        "--concurrency",
+        help="Maximum simultaneous page requests (concurrent HTTP/2 streams rather than sockets). "
+        "0 uses min(pages, 32).",
+        default=0,
+        type=concurrency_limit,
+        dest="concurrency",
+    )
+    add_argument(
         "-i",
         "--interactive",
         help="Interactive argument parsing",
         default=False,
         action="store_true",
         dest="interactive",
+        prompt=False,  # don't need to re-parse the interactive argument
     )
-    return parser.parse_args(args)
+    return parser.parse_args(args), converters
+
+
+def parse_bool(value: str) -> bool:
+    return value.lower() in ("t", "true", "1", "yes")
 
 
-def interactive_parsing(args: argparse.Namespace) -> argparse.Namespace:
-    for argument in vars(args):
-        if argument == "interactive":
-            continue  # don't need to re-parse the interactive argument
-        new_argument = input(f"{argument:<15} {args.__getattribute__(argument)}: ")
+def concurrency_limit(value: str) -> int:
+    limit = int(value)
+    if limit < 0:
+        raise argparse.ArgumentTypeError(f"must be at least 1, or 0 for automatic, not {limit}")
+    return limit
+
+
+def interactive_parsing(
+    args: argparse.Namespace, converters: Dict[str, Callable[[str], object]]
+) -> argparse.Namespace:
+    for argument, converter in converters.items():
+        new_argument = input(f"{argument:<15} {getattr(args, argument)}: ")
         if new_argument:
-            if isinstance(args.__getattribute__(argument), int) and not isinstance(
-                args.__getattribute__(argument), bool
-            ):
-                args.__setattr__(argument, int(new_argument))
-            elif isinstance(args.__getattribute__(argument), list):
-                args.__setattr__(argument, [int(x) for x in new_argument.split(" ")])
-            elif isinstance(args.__getattribute__(argument), bool):
-                if new_argument.lower() in ("t", "true"):
-                    args.__setattr__(argument, True)
-                else:
-                    args.__setattr__(argument, False)
-            elif isinstance(args.__getattribute__(argument), str):
-                args.__setattr__(argument, new_argument)
+            setattr(args, argument, converter(new_argument))
     return args
 
 
-def download_images(
+async def download_images(
     base_url: str,
     npages: int,
     directory: Union[str, bytes, PathLike],
     site: Site,
+    concurrency: int = 0,
 ) -> None:
-    replacement_url = get_replacement_url(base_url=base_url, site=site)
+    if concurrency < 0:
+        raise ValueError(f"{concurrency=} is negative")
+    url_template = get_url_template(base_url=base_url, site=site)
     url_info = []
     for i in range(1, npages + 1):
-        new_url = build_url(replacement_url=replacement_url, page_number=i, site=site)
+        new_url = build_url(url_template=url_template, page_number=i, site=site)
         url_info.append((i, new_url))
-    pool = Pool(10)
-    for image_data in pool.imap_unordered(fetch_image, url_info):
-        page_number = image_data[0]
-        image = image_data[1]
-        starting_bytes = image[:16].hex()
-        image_type = determine_filetype(starting_bytes=starting_bytes)
-        if not image_type:
-            warn(f"could not determine file type for {page_number=}, {starting_bytes=}")
-        image_file = join(directory, f"{page_number}{image_type}")
-        with open(image_file, "wb") as file:
-            file.write(image)
+    # only keep validators for pages that are still on disk, a 304 is useless without the file
+    cache_file = join(directory, ".etags.json")
+    cache = load_cache(cache_file=cache_file)
+    on_disk = set()
+    for page_number, image in find_pages(directory=directory):
+        if page_number > npages:
+            remove(image)  # left over from a longer book
+        elif dirname(image) != page_directory(directory=directory, page=page_number):
+            remove(image)  # from before pages were sharded, would otherwise end up in the pdf twice
+        else:
+            on_disk.add(page_number)
+    for page in range(0, npages + 1, PAGES_PER_DIRECTORY):
+        makedirs(page_directory(directory=directory, page=page), exist_ok=True)
+    cache = {url: cache[url] for page, url in url_info if page in on_disk and url in cache}
+    if concurrency == 0:
+        workers = max(1, min(npages, 32))  # automatic
+    else:
+        workers = concurrency
+    semaphore = asyncio.Semaphore(workers)
+    limits = httpx.Limits(max_connections=workers)
+    # requests queued behind the connection limit shouldn't time out while waiting for a slot
+    timeout = httpx.Timeout(30.0, pool=None)
+    # fetches hand their chunks to a single writer so network reads never wait on the disk,
+    # the bounded queue keeps the fetches from getting too far ahead of it
+    write_queue = asyncio.Queue(maxsize=workers * 2)
+    writer = asyncio.create_task(write_images(write_queue=write_queue))
+    # the writer is stopped and the cache saved even when interrupted, so finished pages aren't fetched again
+    try:
+        async with httpx.AsyncClient(
+            http2=HTTP2, follow_redirects=True, limits=limits, timeout=timeout
+        ) as client:
+            fetches = [
+                fetch_image(
+                    url_info=info,
+                    client=client,
+                    cache=cache,
+                    directory=directory,
+                    semaphore=semaphore,
+                    write_queue=write_queue,
+                )
+                for info in url_info
+            ]
+            # let every page finish before stopping the writer, failed pages are raised afterwards
+            results = await asyncio.gather(*fetches, return_exceptions=True)
+    finally:
+        await write_queue.put(None)
+        await writer
+        save_cache(cache_file=cache_file, cache=cache)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
     return None
 
 
-def get_replacement_url(base_url: str, site: Site) -> str:
+async def write_images(write_queue: asyncio.Queue) -> None:
+    # jobs are (part_file, chunks, done).  chunks are appended to part_file, done is set once the file is closed.
+    # chunks of None with a done future abandons the file, None stops the writer.  abandoning is only cleanup
+    # after another error, so its own failures are warned about and done always gets a result.
+    files = {}
+    errors = {}
+    # nothing here may escape the loop, every fetch waiting on done or on the queue would hang if the writer died
+    while (job := await write_queue.get()) is not None:
+        part_file, chunks, done = job
+        try:
+            if part_file not in errors and chunks is not None:
+                if part_file not in files:
+                    files[part_file] = await asyncio.to_thread(open, part_file, "wb")
+                await asyncio.to_thread(files[part_file].writelines, chunks)
+        except Exception as e:
+            errors.setdefault(part_file, e)  # reported when the file is finished
+        if done is None:
+            continue
+        try:
+            if part_file in files:
+                await asyncio.to_thread(files.pop(part_file).close)
+        except Exception as e:
+            errors.setdefault(part_file, e)
+        try:
+            if chunks is None and exists(part_file):
+                await asyncio.to_thread(remove, part_file)
+        except Exception as e:
+            errors.setdefault(part_file, e)
+        error = errors.pop(part_file, None)
+        if error is not None and chunks is None:
+            warn(f"could not clean up {part_file}: {error}")
+            done.set_result(None)
+        elif error is not None:
+            done.set_exception(error)
+        else:
+            done.set_result(None)
+
+
+def load_cache(cache_file: Union[str, bytes, PathLike]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    if not exists(cache_file):
+        return {}
+    try:
+        with open(cache_file, "r") as file:
+            return {url: tuple(validators) for url, validators in json.load(file).items()}
+    except (OSError, ValueError) as e:
+        warn(f"ignoring unreadable cache {cache_file}: {e}")
+        return {}
+
+
+def save_cache(cache_file: Union[str, bytes, PathLike], cache: Dict[str, Tuple[Optional[str], Optional[str]]]) -> None:
+    with open(cache_file, "w") as file:
+        json.dump(cache, file, indent=2)
+
+
+def get_url_template(base_url: str, site: Site) -> Tuple[str, str]:
+    # split the url around the page number once so each page's url is a plain concatenation
     if site == Site.BABLE:
         # https://babel.hathitrust.org/cgi/imgsrv/image?id=coo.31924000478770;seq=1;size=125;rotation=0
-        replacement = "seq=PAGENUMBER"
-        expression = re.compile(r"seq=\d+")
-        replacement_url = expression.sub(replacement, base_url)
-        return replacement_url
+        match = SEQ_EXPRESSION.search(base_url)
     elif site == Site.ARCHIVE:
         # https://ia802509.us.archive.org/BookReader/BookReaderImages.php?zip=/22/items/
         # letitrainwhitewa0000bird/letitrainwhitewa0000bird_jp2.zip&file=letitrainwhitewa0000bird_jp2/
         # letitrainwhitewa0000bird_0001.jp2&id=letitrainwhitewa0000bird&scale=1&rotate=0
-        replacement = "_PAGENUMBER.jp2"
-        expression = re.compile(r"_\d+\.jp2")
-        replacement_url = expression.sub(replacement, base_url)
-        return replacement_url
+        match = ARCHIVE_EXPRESSION.search(base_url)
+    if match is None:
+        raise ValueError(f"could not find the page number in {base_url}")
+    return base_url[: match.start()], base_url[match.end() :]
 
 
-def build_url(replacement_url: str, page_number: int, site: Site) -> str:
-    replacement_string = "PAGENUMBER"
+def build_url(url_template: Tuple[str, str], page_number: int, site: Site) -> str:
+    prefix, suffix = url_template
     if site == Site.BABLE:
-        url = replacement_url.replace(replacement_string, f"{page_number}")
-        return url
+        return f"{prefix}seq={page_number}{suffix}"
     elif site == Site.ARCHIVE:
-        url = replacement_url.replace(replacement_string, f"{page_number:04}")
-        return url
+        return f"{prefix}_{page_number:04}.jp2{suffix}"
 
 
-def fetch_image(url_info: Tuple[int, str]) -> Tuple[int, bytes]:
+async def fetch_image(
+    url_info: Tuple[int, str],
+    client: httpx.AsyncClient,
+    cache: Dict[str, Tuple[Optional[str], Optional[str]]],
+    directory: Union[str, bytes, PathLike],
+    semaphore: asyncio.Semaphore,
+    write_queue: asyncio.Queue,
+) -> Tuple[int, Optional[str]]:
     page = url_info[0]
     url = url_info[1]
-    for i in range(10):
+    headers = {}
+    etag, last_modified = cache.get(url, (None, None))
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    delay = RETRY_BASE
+    for i in range(RETRY_ATTEMPTS):
         try:
-            with urlopen(url=url) as site:
+            # the slot is only held for the request itself, not while backing off
+            async with semaphore:
                 print(f"fetching url {url}")
-                return page, site.read()
-        except HTTPError as e:
-            sleep_time = randint(0, (2**i) - 1)
-            print(f"encountered {e} on attempt {i} for page {page}, sleeping {sleep_time} second(s)...")
-            sleep(sleep_time)
-
-
-def determine_filetype(starting_bytes: str) -> str:
-    sigs = {
-        ".gif": ["474946383761", "474946383961"],
-        ".png": ["89504E470D0A1A0A"],
-        ".jpg": ["FFD8FFDB", "FFD8FFE000104A4649460001"],
-    }
-    for ext, sigs in sigs.items():
-        for sig in sigs:
-            if sig == starting_bytes[: len(sig)].upper():
-                return ext
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304:
+                        return page, None  # not modified, existing file is current
+                    response.raise_for_status()
+                    image_type = await stream_image(
+                        response=response, page=page, directory=directory, write_queue=write_queue
+                    )
+            cache[url] = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return page, image_type
+        except (httpx.HTTPStatusError, *TRANSIENT_ERRORS) as e:
+            retry_after = None
+            if isinstance(e, httpx.HTTPStatusError):
+                status = e.response.status_code
+                if status != 429 and status < 500:
+                    raise  # 404, 410 etc. won't fix themselves
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+            if i == RETRY_ATTEMPTS - 1:
+                raise
+            # decorrelated jitter, spreads retries out without letting them grow unbounded
+            delay = min(RETRY_CAP, uniform(RETRY_BASE, delay * 3))
+            sleep_time = min(RETRY_CAP, retry_after) if retry_after is not None else delay
+            print(f"encountered {e} on attempt {i} for page {page}, sleeping {sleep_time:.1f} second(s)...")
+            await asyncio.sleep(sleep_time)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either a number of seconds or an http date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def page_directory(directory: Union[str, bytes, PathLike], page: int) -> str:
+    # pages are sharded into subdirectories so no single directory grows to thousands of entries
+    return join(directory, f"{page // PAGES_PER_DIRECTORY:04d}")
+
+
+async def stream_image(
+    response: httpx.Response,
+    page: int,
+    directory: Union[str, bytes, PathLike],
+    write_queue: asyncio.Queue,
+) -> str:
+    # written to a .part file and renamed once complete so an interrupted download never looks like an image
+    subdirectory = page_directory(directory=directory, page=page)
+    part_file = join(subdirectory, f"{page}.part")
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    # each chunk goes straight from the response to the file, only the first few bytes are kept aside for sniffing
+    starting_bytes = b""
+    # chunks are batched so each job covers many chunks rather than one
+    chunks = []
+    buffered = 0
+    try:
+        async for chunk in response.aiter_bytes():
+            if len(starting_bytes) < SNIFF_SIZE:
+                starting_bytes += chunk[: SNIFF_SIZE - len(starting_bytes)]
+            chunks.append(chunk)
+            buffered += len(chunk)
+            if buffered >= WRITE_BATCH_SIZE:
+                await write_queue.put((part_file, chunks, None))
+                chunks = []
+                buffered = 0
+        await write_queue.put((part_file, chunks, done))
+        # shielded so cancelling the fetch doesn't cancel done under the writer, shield also retrieves any
+        # exception set on it afterwards
+        await asyncio.shield(done)
+    except BaseException:
+        # includes cancellation, the writer has to close and remove the .part file either way
+        abandoned = loop.create_future()
+        await write_queue.put((part_file, None, abandoned))
+        await asyncio.wait([abandoned])  # waits without cancelling abandoned if this fetch is cancelled again
+        raise
+    image_type = determine_filetype(starting_bytes=starting_bytes)
+    if not image_type:
+        warn(f"could not determine file type for {page=}, starting_bytes={starting_bytes.hex()}")
+    image_file = join(subdirectory, f"{page}{image_type}")
+    await asyncio.to_thread(finish_page, part_file=part_file, image_file=image_file, page=page)
+    return image_type
+
+
+def finish_page(part_file: str, image_file: str, page: int) -> None:
+    remove_stale_pages(image_file=image_file, page=page)
+    replace(part_file, image_file)
+
+
+def remove_stale_pages(image_file: str, page: int) -> None:
+    # a page saved with a different extension, e.g. from another book, would otherwise end up in the pdf too
+    with scandir(dirname(image_file)) as entries:
+        for entry in entries:
+            stem, _, ext = entry.name.partition(".")
+            if stem == f"{page}" and ext != "part" and entry.path != image_file:
+                remove(entry.path)
+
+
+def determine_filetype(starting_bytes: bytes) -> str:
+    for sig, ext in FILE_SIGNATURES:
+        if starting_bytes.startswith(sig):
+            return ext
     return ""
 
 
@@ -242,32 +504,119 @@ def make_pdf(
 ) -> str:
     image_files = find_images(directory=image_directory)
     pdf_name = f"{title} - {author}.pdf"
-    letter = (img2pdf.in_to_pt(8.5), img2pdf.in_to_pt(11))
-    layout_fun = img2pdf.get_layout_fun(letter)
-    with open(join(pdf_directory, pdf_name), "wb") as file:
+    with open(join(pdf_directory, pdf_name), "wb") as file, ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
         print(f"creating {pdf_name}")
-        file.write(img2pdf.convert(image_files, author=author, title=title, layout_fun=layout_fun))
+        # img2pdf reads its images one at a time, so read a few pages ahead in parallel to overlap the disk io
+        read_ahead = ImageReadAhead(image_files=image_files, executor=executor, depth=READ_AHEAD)
+        images = [PrefetchedImage(read_ahead=read_ahead, index=i) for i in range(len(image_files))]
+        # write straight into the file rather than building the whole pdf as bytes first
+        img2pdf.convert(images, author=author, title=title, layout_fun=LETTER_LAYOUT, outputstream=file)
     return pdf_name
 
 
+class ImageReadAhead:
+    # img2pdf asks for images in order, so keep at most depth reads in flight ahead of the one it wants
+    def __init__(self, image_files: List[str], executor: ThreadPoolExecutor, depth: int) -> None:
+        self.image_files = image_files
+        self.executor = executor
+        self.depth = depth
+        self.pending = {}
+        self.next_index = 0
+
+    def read(self, index: int) -> bytes:
+        while self.next_index < len(self.image_files) and self.next_index <= index + self.depth:
+            self.pending[self.next_index] = self.executor.submit(read_file, self.image_files[self.next_index])
+            self.next_index += 1
+        return self.pending.pop(index).result()
+
+
+class PrefetchedImage:
+    # file-like stand-in handed to img2pdf, which only calls read()
+    def __init__(self, read_ahead: ImageReadAhead, index: int) -> None:
+        self.read_ahead = read_ahead
+        self.index = index
+
+    def read(self) -> bytes:
+        return self.read_ahead.read(self.index)
+
+
+def read_file(file_name: Union[str, bytes, PathLike]) -> bytes:
+    with open(file_name, "rb") as file:
+        return file.read()
+
+
 def find_images(directory: Union[str, bytes, PathLike]) -> List[str]:
-    files = listdir(directory)
-    images = filter(is_image, files)
-    images = [join(directory, image) for image in sorted(images, key=lambda x: int(x.split(".")[0].split("_")[-1]))]
-    return images
+    return [image for _, image in find_pages(directory=directory)]
 
 
-def is_image(filename: str) -> bool:
-    image_types = ("jpg", "png", "gif")
-    if filename.split(".")[-1] in image_types:
-        return True
-    return False
+def find_pages(directory: Union[str, bytes, PathLike]) -> List[Tuple[int, str]]:
+    images = []
+    for root, _, files in walk(directory):
+        for name in files:
+            stem, _, ext = name.rpartition(".")
+            if not stem or ext not in ("jpg", "png", "gif"):
+                continue
+            try:
+                page_number = int(stem.split("_")[-1])
+            except ValueError:
+                continue
+            images.append((page_number, join(root, name)))
+    images.sort()
+    return images
 
 
-def ocr_pdf(directory: Union[str, bytes, PathLike], pdf_file):
+def ocr_pdf(directory: Union[str, bytes, PathLike], pdf_file, tessdata_dir: str = ""):
     input_file = join(directory, pdf_file)
     output_file = join(directory, f"[OCR] {pdf_file}")
-    ocrmypdf.ocr(input_file=input_file, output_file=output_file)
+    # tesseract scales poorly across cores, so run one single threaded tesseract per page in separate processes.
+    with TemporaryDirectory() as temp_dir, pikepdf.open(input_file) as source:
+        page_files = []
+        for i, page in enumerate(source.pages):
+            page_file = join(temp_dir, f"{i}.pdf")
+            with pikepdf.new() as single_page:
+                single_page.pages.append(page)
+                single_page.save(page_file)
+            page_files.append(page_file)
+        with ProcessPoolExecutor(
+            max_workers=cpu_count(), initializer=set_ocr_environment, initargs=(tessdata_dir,)
+        ) as executor:
+            ocr_files = list(executor.map(ocr_page, page_files))
+        print(f"merging {len(ocr_files)} OCR'd pages into {output_file}")
+        # pages are opened from memory, the sources have to stay open until the save and an open file
+        # per page would run out of file descriptors on long books
+        ocr_pages = [pikepdf.open(BytesIO(read_file(ocr_file))) for ocr_file in ocr_files]
+        try:
+            with pikepdf.new() as merged:
+                for ocr_page_pdf in ocr_pages:
+                    merged.pages.extend(ocr_page_pdf.pages)
+                merged.docinfo = merged.copy_foreign(source.docinfo)
+                merged.save(output_file)
+        finally:
+            for ocr_page_pdf in ocr_pages:
+                ocr_page_pdf.close()
+
+
+def set_ocr_environment(tessdata_dir: str) -> None:
+    # runs in each ocr worker, so the settings only reach tesseract and not this process
+    environ.setdefault("OMP_THREAD_LIMIT", "1")
+    if tessdata_dir:
+        environ["TESSDATA_PREFIX"] = tessdata_dir
+
+
+def ocr_page(page_file: str) -> str:
+    ocr_file = f"{page_file}.ocr.pdf"
+    ocrmypdf.ocr(
+        page_file,
+        ocr_file,
+        language=["eng"],
+        jobs=1,
+        tesseract_oem=1,  # lstm only
+        optimize=0,  # don't recompress images
+        output_type="pdf",  # skip pdf/a conversion
+        fast_web_view=999999,  # skip linearization
+        progress_bar=False,
+    )
+    return ocr_file
 
 
 if __name__ == "__main__":